@@ -7,21 +7,61 @@ import os
 import requests
 import openai
 import json 
+from shared_cache import SharedCache, Uncached
+from embedding_queue import EmbeddingQueue, source_fingerprint
+from team_report import role_sections, show_error
 
 st.set_page_config(layout="wide", page_title="CO:LAB - AI Team Builder")
 
+# COLAB_BACKEND = "local" runs the app on in-memory Supabase/OpenAI/GitHub
+# stand-ins (see local_backends.py); loadtest.py relies on this.
+USE_LOCAL_BACKEND = st.secrets.get("COLAB_BACKEND") == "local"
+
 try:
-    SUPABASE_URL: str = st.secrets["SUPABASE_URL"]
-    SUPABASE_KEY: str = st.secrets["SUPABASE_KEY"]
-    OPENAI_API_KEY: str = st.secrets["OPENAI_API_KEY"]
-    
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-    openai_client = openai.OpenAI(api_key=OPENAI_API_KEY) # Use new v1+ client
+    if USE_LOCAL_BACKEND:
+        import local_backends
+        supabase, openai_client, http_client = local_backends.connect(st.secrets.get("LOCAL_BACKEND_SESSION"))
+    else:
+        SUPABASE_URL: str = st.secrets["SUPABASE_URL"]
+        SUPABASE_KEY: str = st.secrets["SUPABASE_KEY"]
+        OPENAI_API_KEY: str = st.secrets["OPENAI_API_KEY"]
+        
+        supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+        openai_client = openai.OpenAI(api_key=OPENAI_API_KEY) # Use new v1+ client
+        http_client = requests
     
 except Exception as e:
     st.error("Error: Could not find API keys. Did you set up your .streamlit/secrets.toml file?")
     st.stop()
 
+# One on-disk cache shared by every Streamlit worker on this host. Point
+# COLAB_CACHE_PATH at the same file for all workers; override TTLs (seconds)
+# per namespace with a [cache_ttls] table in secrets.toml.
+@st.cache_resource
+def get_shared_cache():
+    return SharedCache(
+        st.secrets.get("COLAB_CACHE_PATH", os.environ.get("COLAB_CACHE_PATH", ".colab_cache.sqlite3")),
+        ttls=st.secrets.get("cache_ttls", {})
+    )
+
+cache = get_shared_cache()
+
+# Embeddings for saved profiles/projects are computed in the background and
+# backfilled in batches; see embedding_queue.py.
+@st.cache_resource
+def get_embedding_queue():
+    queue_supabase, queue_openai_client = supabase, openai_client
+    if USE_LOCAL_BACKEND:
+        # Count background calls separately from the session that started the queue.
+        queue_supabase, queue_openai_client, _ = local_backends.connect("background")
+    return EmbeddingQueue(
+        queue_supabase,
+        queue_openai_client,
+        on_backfill=lambda tables: cache.invalidate(*tables)
+    ).start()
+
+embedding_queue = get_embedding_queue()
+
 def inject_custom_css():
     st.markdown("""
         <style>
@@ -157,7 +197,7 @@ def inject_custom_css():
     """, unsafe_allow_html=True)
 
 
-@st.cache_data(ttl=3600)
+@cache.cached("embeddings", ttl=3600)
 def get_embedding(text, model="text-embedding-3-small"):
    try:
        text = text.replace("\n", " ")
@@ -165,15 +205,15 @@ def get_embedding(text, model="text-embedding-3-small"):
        return response.data[0].embedding
    except Exception as e:
        st.error(f"Error getting embedding from OpenAI: {e}")
-       return None
+       return Uncached(None)
 
-@st.cache_data(ttl=600)
+@cache.cached("github", ttl=600)
 def get_github_analysis(username):
     if not username:
         return "No GitHub username provided."
     api_url = f"https://api.github.com/users/{username}/repos"
     try:
-        response = requests.get(api_url)
+        response = http_client.get(api_url)
         response.raise_for_status()
         repos = response.json()
         if not repos:
@@ -191,9 +231,9 @@ def get_github_analysis(username):
             report += f"* *{lang}:* {count} {'repo' if count == 1 else 'repos'}\n"
         return report
     except requests.exceptions.HTTPError as e:
-        return f"Error fetching GitHub data: {e.response.status_code}"
+        return Uncached(f"Error fetching GitHub data: {e.response.status_code}")
     except Exception as e:
-        return f"An error occurred: {e}"
+        return Uncached(f"An error occurred: {e}")
 
 def extract_search_intent(query):
     ROLE_OPTIONS_STR = ", ".join(["Developer", "Designer", "Project Manager", "Researcher", "Presenter"])
@@ -229,9 +269,18 @@ def extract_search_intent(query):
         st.error(f"Error calling OpenAI for intent extraction: {e}")
         return { "role": None, "availability": [], "skills_query": None }
 
+def candidate_briefing(matches):
+    briefing = ""
+    for i, match in enumerate(matches):
+        briefing += f"Candidate {i+1}: {match['name']} (Email: {match['email']})\n"
+        briefing += f"Skills: {match['skills']}\n"
+        briefing += f"Reliability: {match.get('reliability_score', 'N/A')}\n"
+        briefing += f"GitHub Analysis: {match.get('github_analysis', 'N/A')}\n"
+        briefing += "\n"
+    return briefing
+
 def generate_team_report(project_title, project_desc, roles_with_matches):
     
-    briefing = f"Project Title: {project_title}\n"
     briefing = f"Project Title: {project_title}\n"
     briefing += f"Project Description: {project_desc}\n\n"
     briefing += "Here are the roles to fill and the top candidates found by the AI search:\n\n"
@@ -242,12 +291,7 @@ def generate_team_report(project_title, project_desc, roles_with_matches):
             briefing += "No candidates found.\n\n"
             continue
             
-        for i, match in enumerate(matches):
-            briefing += f"Candidate {i+1}: {match['name']} (Email: {match['email']})\n"
-            briefing += f"Skills: {match['skills']}\n"
-            briefing += f"Reliability: {match.get('reliability_score', 'N/A')}\n"
-            briefing += f"GitHub Analysis: {match.get('github_analysis', 'N/A')}\n"
-            briefing += "\n"
+        briefing += candidate_briefing(matches)
 
     system_prompt = """
     You are an expert AI recruiting assistant for a student project platform.
@@ -279,56 +323,87 @@ def generate_team_report(project_title, project_desc, roles_with_matches):
         st.error(f"Error calling OpenAI for team report: {e}")
         return None
 
+def generate_role_section(project_title, project_desc, role_name, matches):
+    briefing = f"Project Title: {project_title}\n"
+    briefing += f"Project Description: {project_desc}\n\n"
+    briefing += f"--- ROLE: {role_name} ---\n"
+    briefing += candidate_briefing(matches)
+
+    system_prompt = """
+    You are an expert AI recruiting assistant for a student project platform.
+    You are writing ONE section of a "Dream Team Report" for a Project Leader.
+    Other sections of the report cover the other roles, so do not add an introduction or a conclusion.
+    
+    You will be given the project's details and the top candidates for a single role.
+    
+    - Start with a Markdown heading: ### <role name>
+    - Introduce the top candidate.
+    - *Synthesize* their skills, reliability, and GitHub data to explain why they are a good match for the project.
+    - Be concise, professional and encouraging.
+    """
+    
+    try:
+        return openai_client.chat.completions.create(
+            model="gpt-4o",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": briefing}
+            ],
+            temperature=0.4,
+            stream=True
+        )
+    except Exception as e:
+        show_error(f"Error calling OpenAI for the {role_name} section: {e}")
+        return None
+
+def stream_text(response_stream):
+    for chunk in response_stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
 
-@st.cache_data(ttl=60)
+
+@cache.cached("profiles", ttl=60)
 def get_all_profiles():
     try:
         response = supabase.table('profiles').select("*").execute()
         return response.data
     except Exception as e:
         st.error(f"Error fetching profiles: {e}")
-        return []
+        return Uncached([])
 
 def upsert_profile(profile_data):
     try:
-        if profile_data.get("skills"):
-            st.write("Generating AI skill embedding...")
-            profile_data["skills_embedding"] = get_embedding(profile_data["skills"])
-        else:
-            profile_data["skills_embedding"] = None
-        
-        data, count = supabase.table('profiles').upsert(
-            profile_data,
-            on_conflict='email'
-        ).execute()
-        st.cache_data.clear()
-        return data
+        # One write: save_profile keeps the existing embedding when the skills
+        # hash is unchanged, otherwise it resets the row to 'pending' and the
+        # queue backfills it. Until then the profile is saved but not matchable.
+        profile_data["embedding_source_hash"] = source_fingerprint("profiles", profile_data)
+        response = supabase.rpc('save_profile', {'profile': profile_data}).execute()
+        profile_data["embedding_status"] = response.data
+        cache.invalidate("profiles")
+        if profile_data["embedding_status"] == "pending":
+            embedding_queue.enqueue("profiles", profile_data)
+        return response.data
     except Exception as e:
         st.error(f"Error saving profile: {e}")
         return None
 
-@st.cache_data(ttl=60)
+@cache.cached("projects", ttl=60)
 def get_all_projects_with_roles():
     try:
         response = supabase.table("projects").select("""
-            id, created_at, leader_email, title, description, status, project_embedding,
+            id, created_at, leader_email, title, description, status, project_embedding, embedding_status,
             project_roles ( id, role_name, status )
         """).order('created_at', desc=True).execute()
         return response.data
     except Exception as e:
         st.error(f"Error fetching projects: {e}")
-        return []
+        return Uncached([])
 
 def create_project(project_data, roles_list):
     try:
-        
-        project_text = f"Title: {project_data['title']}\nDescription: {project_data['description']}"
-        project_data['project_embedding'] = get_embedding(project_text)
-        
-        if project_data['project_embedding'] is None:
-            st.error("Failed to create AI embedding for project.")
-            return None
-        
+        project_data['project_embedding'] = None
+        project_data['embedding_status'] = "pending"
+        project_data['embedding_source_hash'] = source_fingerprint("projects", project_data)
         
         project_response = supabase.table("projects").insert(project_data).execute()
         
@@ -339,7 +414,8 @@ def create_project(project_data, roles_list):
         new_project_id = project_response.data[0]['id']
         roles_to_insert = [{"project_id": new_project_id, "role_name": role} for role in roles_list]
         roles_response = supabase.table("project_roles").insert(roles_to_insert).execute()
-        st.cache_data.clear()
+        cache.invalidate("projects")
+        embedding_queue.enqueue("projects", project_response.data[0])
         return project_response.data
     
     except Exception as e:
@@ -362,7 +438,8 @@ def find_matching_profiles(search_query, role, availability):
             'evenings_query': 'evenings' in availability
         }).execute()
         
-        return response.data
+        # Profiles without a ready embedding have no similarity; never show them.
+        return [m for m in response.data if m.get('similarity') is not None]
     except Exception as e:
         st.error(f"Error finding matches: {e}")
         return []
@@ -373,9 +450,9 @@ def find_matches_for_project(project_embedding, role_name):
             'p_project_embedding': project_embedding,
             'p_role_query': role_name
         }).execute()
-        return response.data
+        return [m for m in response.data if m.get('similarity') is not None]
     except Exception as e:
-        st.error(f"Error running project match: {e}")
+        show_error(f"Error running project match: {e}")
         return []
 
 def submit_review(project_id, reviewer_email, reviewee_email, rating):
@@ -386,13 +463,13 @@ def submit_review(project_id, reviewer_email, reviewee_email, rating):
             "reviewee_email": reviewee_email,
             "reliability_rating": rating
         }).execute()
-        st.cache_data.clear()
+        cache.invalidate("ratings")
         return data
     except Exception as e:
         st.error(f"Error submitting review: {e}")
         return None
 
-@st.cache_data(ttl=300)
+@cache.cached("ratings", ttl=300)
 def get_user_rating(user_email):
     try:
         response = supabase.rpc('get_average_rating', {
@@ -400,8 +477,35 @@ def get_user_rating(user_email):
         }).execute()
         return response.data
     except Exception as e:
-        st.error(f"Error fetching rating: {e}")
-        return None
+        show_error(f"Error fetching rating: {e}")
+        return Uncached(None)
+
+def gather_role_candidates(project_embedding, role_name):
+    # 1. Run the AI vector search
+    matches = find_matches_for_project(project_embedding, role_name)
+    
+    # 2. Get extra data (Reliability & GitHub) for top matches
+    top_matches_data = []
+    for match in matches[:3]: # Get top 3
+        # Get reliability
+        rating = get_user_rating(match['email'])
+        match['reliability_score'] = f"{rating:.1f}/5" if rating else "No Reviews"
+        
+        # Get GitHub analysis
+        if match['github_username']:
+            match['github_analysis'] = get_github_analysis(match['github_username'])
+        else:
+            match['github_analysis'] = "No GitHub provided."
+        
+        top_matches_data.append(match)
+    return top_matches_data
+
+def build_role_section(project, role_name):
+    matches = gather_role_candidates(project['project_embedding'], role_name)
+    section_stream = None
+    if matches:
+        section_stream = generate_role_section(project['title'], project['description'], role_name, matches)
+    return matches, section_stream
 
 inject_custom_css()
 st.title("CO:LAB 🚀")
@@ -409,6 +513,9 @@ st.header("The AI-Powered Team Builder")
 st.divider()
 
 ROLE_OPTIONS = ["Developer", "Designer", "Project Manager", "Researcher", "Presenter"]
+# "pipelined" streams one report section per role as soon as it is ready;
+# "single" gathers every role first and streams one combined report.
+TEAM_REPORT_MODE = st.secrets.get("TEAM_REPORT_MODE", "pipelined")
 
 if "recruiter_messages" not in st.session_state:
     recruiter_intro = '<span style="color: #fff; font-weight: bold; font-size: 1.1em;">Hi! I\'m your AI Recruiter. Tell me what kind of teammate you\'re looking for. (e.g., \'I need a Python developer who is free on weekends.\')</span>'
@@ -467,10 +574,12 @@ with tab_profile:
                 "availability_evenings": avail_evenings
             }
             
-            with st.spinner("Saving your profile to the cloud... (This may take a moment to generate AI embedding)"):
+            with st.spinner("Saving your profile to the cloud..."):
                 data = upsert_profile(profile_data)
                 if data:
                     st.success("Profile saved successfully! 🎉")
+                    if profile_data.get("embedding_status") == "pending":
+                        st.info("Your AI skill profile is being generated. You'll show up in matches within a few moments.")
                     st.balloons()
                 else:
                     st.error("There was an error saving your profile.")
@@ -508,10 +617,10 @@ with tab_projects:
                     "title": project_title,
                     "description": project_desc
                 }
-                with st.spinner("Posting your project... (This may take a moment to generate AI embedding)"):
+                with st.spinner("Posting your project..."):
                     data = create_project(project_data, roles_needed)
                     if data:
-                        st.success("Project posted successfully! 🎉")
+                        st.success("Project posted successfully! 🎉 AI team matching will be ready in a few moments.")
                     else:
                         st.error("An error occurred while posting your project.")
 
@@ -523,8 +632,8 @@ with tab_projects:
     if not projects:
         st.info("No projects have been posted yet. Be the first!")
     else:
-        # --- NEW: Create a modal for the AI Auto-Builder ---
-        auto_build_modal = st.modal("🤖 AI Team Builder")
+        # --- AI Auto-Builder report area (Streamlit has no st.modal, so it renders above the list) ---
+        auto_build_modal = st.container()
         
         for p in projects:
             leader_name = next((prof['name'] for prof in all_profiles if prof['email'] == p['leader_email']), p['leader_email'])
@@ -544,51 +653,53 @@ with tab_projects:
             """, unsafe_allow_html=True)
             
             # --- NEW: AI AUTO-BUILDER BUTTON (MILESTONE 7) ---
-            if st.button("🤖 Auto-Build My Team (AI)", key=f"build_{p['id']}", use_container_width=True, help="Click to have AI find and recommend a full team for this project."):
+            if p.get('embedding_status') == "failed":
+                st.button("⚠️ AI matching unavailable for this project", key=f"build_{p['id']}", use_container_width=True, disabled=True, help="The project's AI embedding could not be generated.")
+            elif p.get('embedding_status') in ("pending", "processing") or not p['project_embedding']:
+                st.button("⏳ Preparing AI matching for this project...", key=f"build_{p['id']}", use_container_width=True, disabled=True, help="The project's AI embedding is still being generated. Refresh in a few moments.")
+            elif st.button("🤖 Auto-Build My Team (AI)", key=f"build_{p['id']}", use_container_width=True, help="Click to have AI find and recommend a full team for this project."):
                 
                 with auto_build_modal.container():
                     st.header(f"AI 'Dream Team' Report for:")
                     st.subheader(p['title'])
                     st.divider()
                     
-                    with st.spinner(f"Generating AI embeddings and finding matches for {len(p['project_roles'])} roles..."):
-                        roles_with_matches = {}
-                        
-                        for role in p['project_roles']:
-                            role_name = role['role_name']
-                            
-                            # 1. Run the AI vector search
-                            matches = find_matches_for_project(p['project_embedding'], role_name)
-                            
-                            # 2. Get extra data (Reliability & GitHub) for top matches
-                            top_matches_data = []
-                            for match in matches[:3]: # Get top 3
-                                # Get reliability
-                                rating = get_user_rating(match['email'])
-                                match['reliability_score'] = f"{rating:.1f}/5" if rating else "No Reviews"
-                                
-                                # Get GitHub analysis
-                                if match['github_username']:
-                                    match['github_analysis'] = get_github_analysis(match['github_username'])
+                    if TEAM_REPORT_MODE == "pipelined":
+                        # Each role's section streams as soon as its candidates are ready,
+                        # while the remaining roles are still being gathered.
+                        roles = [role['role_name'] for role in p['project_roles']]
+                        with role_sections(roles, lambda role_name: build_role_section(p, role_name)) as futures:
+                            for future in futures:
+                                with st.spinner("Finding matches for the next role..."):
+                                    role_name, matches, section_stream, errors = future.result()
+                                for error in errors:
+                                    st.error(error)
+                                if not matches:
+                                    st.markdown(f"### {role_name}\nNo candidates found for this role yet.")
+                                elif section_stream:
+                                    st.write_stream(stream_text(section_stream))
                                 else:
-                                    match['github_analysis'] = "No GitHub provided."
-                                
-                                top_matches_data.append(match)
+                                    st.error(f"The AI report generator failed for the {role_name} role.")
+                    else:
+                        with st.spinner(f"Generating AI embeddings and finding matches for {len(p['project_roles'])} roles..."):
+                            roles_with_matches = {}
                             
-                            roles_with_matches[role_name] = top_matches_data
-                    
-                    # 3. Send all data to the LLM for the final report
-                    with st.spinner("Contacting Generative AI to write your 'Dream Team' report..."):
-                        report_stream = generate_team_report(
-                            p['title'],
-                            p['description'],
-                            roles_with_matches
-                        )
+                            for role in p['project_roles']:
+                                role_name = role['role_name']
+                                roles_with_matches[role_name] = gather_role_candidates(p['project_embedding'], role_name)
                         
-                        if report_stream:
-                            st.write_stream(report_stream) # Stream the AI's response!
-                        else:
-                            st.error("The AI report generator failed.")
+                        # 3. Send all data to the LLM for the final report
+                        with st.spinner("Contacting Generative AI to write your 'Dream Team' report..."):
+                            report_stream = generate_team_report(
+                                p['title'],
+                                p['description'],
+                                roles_with_matches
+                            )
+                            
+                            if report_stream:
+                                st.write_stream(stream_text(report_stream)) # Stream the AI's response!
+                            else:
+                                st.error("The AI report generator failed.")
 
             st.button("I'm Interested in this Project", key=f"apply_{p['id']}", use_container_width=True)
 
@@ -1,5 +1,6 @@
 import streamlit as st
 from supabase import create_client, Client
+from diagnostics import run_diagnostics
 
 try:
     url = st.secrets["SUPABASE_URL"]
@@ -9,19 +10,14 @@ try:
     
     st.write("### Testing Tables:")
     
-    try:
-        profiles = supabase.table('profiles').select("*").execute()
-        st.write(f"✅ Profiles table exists. Records: {len(profiles.data)}")
-        st.write(profiles.data)
-    except Exception as e:
-        st.error(f"❌ Profiles table error: {e}")
-    
-    try:
-        messages = supabase.table('messages').select("*").execute()
-        st.write(f"✅ Messages table exists. Records: {len(messages.data)}")
-        st.write(messages.data)
-    except Exception as e:
-        st.error(f"❌ Messages table error: {e}")
+    report = run_diagnostics(supabase)
+    for probe in report["probes"]:
+        label = f"{probe['name']} ({probe['kind']}, {probe['probe']}) - {probe['latency_ms']} ms"
+        if probe["ok"]:
+            st.write(f"✅ {label}" + (f" - Records (estimated): {probe['rows']}" if "rows" in probe else ""))
+        else:
+            st.error(f"❌ {label}: {probe['error']}")
+    st.caption(f"All probes finished in {report['total_ms']} ms. Run `python diagnostics.py` for the same check without Streamlit.")
     
     st.write("### Test Sending a Message:")
     with st.form("test_message"):
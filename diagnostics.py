@@ -0,0 +1,145 @@
+"""Headless health/latency check for the Supabase objects co_lab.py depends on.
+
+Table probes use the planner's row estimate and a limit-1 read, so they take
+the same few milliseconds no matter how many rows a table holds. RPC probes
+are different: the match functions score every profile for a role before
+the limit applies, so their latency grows with the profiles table. They are
+marked `"constant_cost": false` in the report.
+
+    python diagnostics.py                 # uses SUPABASE_URL / SUPABASE_KEY or .streamlit/secrets.toml
+    python diagnostics.py --url http://127.0.0.1:54321 --key <anon-key>
+    python diagnostics.py --local         # in-memory stand-in backend
+    python diagnostics.py --exact-count   # exact COUNT(*) per table (slow on large tables)
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+EMBEDDING_DIMENSIONS = 1536
+PROBE_EMAIL = "diagnostics@co-lab.invalid"
+
+TABLES = ["profiles", "projects", "project_roles", "team_reviews", "messages"]
+
+
+def _rpc_probes():
+    # A zero vector has no cosine distance under pgvector (NaN), so probe with a unit vector.
+    unit_embedding = [1.0] + [0.0] * (EMBEDDING_DIMENSIONS - 1)
+    # Cosine similarity never exceeds 1.0, so match_profiles answers with no rows.
+    return [
+        ("match_profiles", {
+            'query_embedding': unit_embedding,
+            'match_threshold': 1.1,
+            'role_query': "Developer",
+            'weekdays_query': False,
+            'weekends_query': False,
+            'evenings_query': False
+        }),
+        ("match_profiles_for_project", {
+            'p_project_embedding': unit_embedding,
+            'p_role_query': "Developer"
+        }),
+        ("get_average_rating", {
+            'user_email': PROBE_EMAIL
+        }),
+    ]
+
+
+def _timed(name, kind, probe, call, constant_cost=True):
+    start = time.perf_counter()
+    result = {"name": name, "kind": kind, "probe": probe, "constant_cost": constant_cost}
+    try:
+        result.update(call())
+        result["ok"] = True
+    except Exception as e:
+        result["ok"] = False
+        result["error"] = str(e)
+    result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+def probe_table(client, table, count="planned"):
+    checks = []
+
+    def count_rows():
+        response = client.table(table).select("*", count=count, head=True).execute()
+        return {"rows": response.count}
+
+    def sample_row():
+        response = client.table(table).select("*").limit(1).execute()
+        return {"sampled": len(response.data)}
+
+    checks.append(_timed(table, "table", f"count_{count}", count_rows, constant_cost=count != "exact"))
+    checks.append(_timed(table, "table", "limit_1", sample_row))
+    return checks
+
+
+def probe_rpc(client, name, params):
+    def call():
+        response = client.rpc(name, params).limit(1).execute()
+        data = response.data
+        return {"returned": len(data) if isinstance(data, list) else int(data is not None)}
+
+    return _timed(name, "rpc", "limit_1", call, constant_cost=name == "get_average_rating")
+
+
+def run_diagnostics(client, count="planned"):
+    start = time.perf_counter()
+    probes = []
+    for table in TABLES:
+        probes.extend(probe_table(client, table, count))
+    for name, params in _rpc_probes():
+        probes.append(probe_rpc(client, name, params))
+    return {
+        "ok": all(p["ok"] for p in probes),
+        "total_ms": round((time.perf_counter() - start) * 1000, 1),
+        "probes": probes,
+    }
+
+
+def _load_credentials(url, key):
+    url = url or os.environ.get("SUPABASE_URL")
+    key = key or os.environ.get("SUPABASE_KEY")
+    if url and key:
+        return url, key
+    secrets_path = os.path.join(".streamlit", "secrets.toml")
+    if os.path.exists(secrets_path):
+        import tomllib
+        with open(secrets_path, "rb") as f:
+            secrets = tomllib.load(f)
+        url = url or secrets.get("SUPABASE_URL")
+        key = key or secrets.get("SUPABASE_KEY")
+    return url, key
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check CO:LAB's Supabase tables and RPCs.")
+    parser.add_argument("--url", help="Supabase URL (defaults to SUPABASE_URL or .streamlit/secrets.toml)")
+    parser.add_argument("--key", help="Supabase key (defaults to SUPABASE_KEY or .streamlit/secrets.toml)")
+    parser.add_argument("--local", action="store_true", help="Probe the in-memory stand-in backend.")
+    parser.add_argument("--exact-count", action="store_true", help="Use exact COUNT(*) instead of the planner's estimate.")
+    parser.add_argument("--pretty", action="store_true", help="Indent the JSON report.")
+    args = parser.parse_args(argv)
+
+    if args.local:
+        from local_backends import LocalSupabase
+        client = LocalSupabase()
+    else:
+        url, key = _load_credentials(args.url, args.key)
+        if not url or not key:
+            parser.error("No Supabase credentials found. Pass --url/--key or set SUPABASE_URL/SUPABASE_KEY.")
+        from supabase import create_client
+        try:
+            client = create_client(url, key)
+        except Exception as e:
+            print(json.dumps({"ok": False, "error": f"Connection error: {e}", "probes": []}))
+            return 1
+
+    report = run_diagnostics(client, "exact" if args.exact_count else "planned")
+    print(json.dumps(report, indent=2 if args.pretty else None))
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+"""Write-behind queue that backfills embeddings after a row has been saved.
+
+Profiles and projects are written with `embedding_status = 'pending'`, a
+NULL embedding and an `embedding_source_hash` fingerprint of the text to
+embed, so a save is a single database write. A background thread batches
+pending rows into one OpenAI embeddings request and writes the vectors back
+with `embedding_status = 'ready'`, but only while the row's fingerprint still
+matches the text that was embedded. A failed batch is split to isolate the
+rows the API rejects; failing rows back off and, after the API has rejected
+a row `max_attempts` times, it is marked `embedding_status = 'failed'`.
+Outages and rate limits never fail a row, they just keep backing off. Rows
+left pending by a crash or restart are picked up by a periodic sweep.
+
+Every worker process runs its own queue and sweep, so before embedding a
+row a queue claims it by switching it to `embedding_status = 'processing'`
+with an `embedding_claimed_at` timestamp; only the worker whose update
+matched embeds it. A claim is renewed on every retry and released back to
+`pending` by any sweep once it is older than `claim_ttl`, so rows held by
+a worker that died are picked up again.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+EmbeddingTarget = namedtuple("EmbeddingTarget", ["key_column", "embedding_column", "source_columns", "text"])
+
+
+def profile_text(row):
+    return row.get("skills")
+
+
+def project_text(row):
+    return f"Title: {row['title']}\nDescription: {row['description']}"
+
+
+TARGETS = {
+    "profiles": EmbeddingTarget("email", "skills_embedding", ("skills",), profile_text),
+    "projects": EmbeddingTarget("id", "project_embedding", ("title", "description"), project_text),
+}
+
+
+def source_fingerprint(table, row):
+    """Short hash of the text a row's embedding is computed from (None if there is none)."""
+    text = TARGETS[table].text(row)
+    if not text:
+        return None
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+def _utc_now(offset=0):
+    return (datetime.now(timezone.utc) + timedelta(seconds=offset)).isoformat()
+
+
+def _rejected_input(error):
+    """True for API errors caused by the request itself (e.g. 400 too many tokens)."""
+    status = getattr(error, "status_code", None)
+    return status is not None and 400 <= status < 500 and status != 429
+
+
+class PendingEmbedding:
+    def __init__(self, table, key, text, fingerprint):
+        self.table = table
+        self.key = key
+        self.text = text
+        self.fingerprint = fingerprint
+        self.attempts = 0  # times the API rejected this text
+        self.failures = 0  # consecutive failures of any kind, for the backoff
+        self.not_before = 0.0
+        self.claimed_at = None  # embedding_claimed_at while this queue owns the row
+
+
+class EmbeddingQueue:
+    def __init__(self, supabase, openai_client, model="text-embedding-3-small", batch_size=32,
+                 batch_wait=0.5, sweep_interval=30, max_backoff=300, max_attempts=5, claim_ttl=900,
+                 on_backfill=None):
+        self.supabase = supabase
+        self.openai_client = openai_client
+        self.model = model
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.sweep_interval = sweep_interval
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        # Must comfortably exceed max_backoff, since a claim is only renewed on retry.
+        self.claim_ttl = claim_ttl
+        self.on_backfill = on_backfill
+        self._items = {}
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="embedding-queue", daemon=True)
+            self._thread.start()
+        return self
+
+    def enqueue(self, table, row):
+        """Queue an embedding for a saved row; `row` must hold the key and source columns."""
+        target = TARGETS[table]
+        item = PendingEmbedding(
+            table,
+            row[target.key_column],
+            target.text(row),
+            source_fingerprint(table, row)
+        )
+        with self._cond:
+            # A newer save of the same row replaces the queued one.
+            self._items.pop((table, item.key), None)
+            self._items[(table, item.key)] = item
+            self._cond.notify()
+
+    def _ready(self):
+        now = time.monotonic()
+        return [item for item in self._items.values() if item.not_before <= now]
+
+    def _next_batch(self, timeout):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while not self._ready():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                retry_delays = [item.not_before - time.monotonic() for item in self._items.values()]
+                self._cond.wait(max(0.01, min([remaining] + retry_delays)))
+            if len(self._ready()) < self.batch_size:
+                # Give concurrent saves a moment to join this batch.
+                self._cond.wait(self.batch_wait)
+            batch = self._ready()[:self.batch_size]
+            for item in batch:
+                del self._items[(item.table, item.key)]
+            return batch
+
+    def _run(self):
+        next_sweep = 0.0
+        while True:
+            try:
+                if time.monotonic() >= next_sweep:
+                    self.sweep()
+                    next_sweep = time.monotonic() + self.sweep_interval
+                batch = self._next_batch(max(0.0, next_sweep - time.monotonic()))
+                if batch:
+                    self.process(batch)
+            except Exception:
+                logger.exception("Embedding queue iteration failed")
+                time.sleep(1)
+
+    def sweep(self):
+        """Queue rows still marked pending in the database, e.g. after a restart.
+
+        First releases claims older than `claim_ttl`, then pages through
+        every pending row in key order, skipping rows this queue already
+        holds, so rows that keep failing can't crowd out rows orphaned by a
+        restart. Rows being retried by any worker stay claimed and are not
+        returned at all.
+        """
+        expired = _utc_now(-self.claim_ttl)
+        for table, target in TARGETS.items():
+            try:
+                self.supabase.table(table).update({"embedding_status": "pending"}).eq(
+                    "embedding_status", "processing"
+                ).lt("embedding_claimed_at", expired).execute()
+            except Exception as e:
+                logger.warning("Could not release expired %s embedding claims: %s", table, e)
+            columns = ", ".join((target.key_column,) + target.source_columns)
+            last_key = None
+            while True:
+                query = self.supabase.table(table).select(columns).eq("embedding_status", "pending")
+                if last_key is not None:
+                    query = query.gt(target.key_column, last_key)
+                try:
+                    response = query.order(target.key_column).limit(self.batch_size).execute()
+                except Exception as e:
+                    logger.warning("Could not sweep pending %s embeddings: %s", table, e)
+                    break
+                for row in response.data:
+                    with self._cond:
+                        if (table, row[target.key_column]) in self._items:
+                            continue
+                    self.enqueue(table, row)
+                if len(response.data) < self.batch_size:
+                    break
+                last_key = response.data[-1][target.key_column]
+
+    def _claim(self, batch):
+        """Claim the batch's rows for this worker and return the items it now owns.
+
+        Fresh items are claimed with one update per table from `pending` to
+        `processing`; the returned rows carry the latest saved text, which
+        replaces the queued text. Retried items renew their own claim.
+        Items whose row another worker claimed, or that is no longer
+        pending, are dropped.
+        """
+        claimed_at = _utc_now()
+        owned = []
+        fresh = defaultdict(list)
+        for item in batch:
+            if item.claimed_at is None:
+                fresh[item.table].append(item)
+                continue
+            target = TARGETS[item.table]
+            try:
+                renewed = self.supabase.table(item.table).update({"embedding_claimed_at": claimed_at}).eq(
+                    target.key_column, item.key
+                ).eq("embedding_status", "processing").eq("embedding_claimed_at", item.claimed_at).execute()
+            except Exception as e:
+                self._retry(item, e)
+                continue
+            if renewed.data:
+                item.claimed_at = claimed_at
+                owned.append(item)
+
+        for table, items in fresh.items():
+            target = TARGETS[table]
+            queued = {item.key: item for item in items}
+            try:
+                response = self.supabase.table(table).update({
+                    "embedding_status": "processing",
+                    "embedding_claimed_at": claimed_at
+                }).in_(target.key_column, list(queued)).eq("embedding_status", "pending").execute()
+            except Exception as e:
+                for item in items:
+                    self._retry(item, e)
+                continue
+            for row in response.data:
+                item = queued[row[target.key_column]]
+                item.text = target.text(row)
+                item.fingerprint = row.get("embedding_source_hash")
+                item.claimed_at = claimed_at
+                owned.append(item)
+        return owned
+
+    def _guarded_update(self, item, values):
+        target = TARGETS[item.table]
+        query = self.supabase.table(item.table).update(values).eq(target.key_column, item.key)
+        # Only write if the row still holds the text this item was queued for.
+        if item.fingerprint is None:
+            query = query.is_("embedding_source_hash", "null")
+        else:
+            query = query.eq("embedding_source_hash", item.fingerprint)
+        query.execute()
+
+    def _retry(self, item, error):
+        with self._cond:
+            if (item.table, item.key) in self._items:
+                return  # a newer save is already queued
+        item.failures += 1
+        if _rejected_input(error):
+            item.attempts += 1
+        if item.attempts >= self.max_attempts:
+            logger.error("Giving up on embedding %s %s after %d attempts: %s",
+                         item.table, item.key, item.attempts, error)
+            try:
+                self._guarded_update(item, {"embedding_status": "failed"})
+            except Exception as e:
+                logger.warning("Could not mark %s %s as failed: %s", item.table, item.key, e)
+            return
+        logger.warning("Embedding %s %s failed (%d in a row), will retry: %s",
+                       item.table, item.key, item.failures, error)
+        with self._cond:
+            if (item.table, item.key) in self._items:
+                return
+            item.not_before = time.monotonic() + min(self.max_backoff, 2 ** min(item.failures, 16))
+            self._items[(item.table, item.key)] = item
+
+    def _embed(self, items):
+        """Embed `items`, splitting rejected requests in half to isolate the bad texts.
+
+        Returns ({id(item): embedding}, [(item, error), ...]). Outages and rate
+        limits fail the whole request without splitting it.
+        """
+        try:
+            response = self.openai_client.embeddings.create(
+                input=[item.text.replace("\n", " ") for item in items],
+                model=self.model
+            )
+            return {id(items[d.index]): d.embedding for d in response.data}, []
+        except Exception as e:
+            if len(items) == 1 or not _rejected_input(e):
+                return {}, [(item, e) for item in items]
+            middle = len(items) // 2
+            left, left_failures = self._embed(items[:middle])
+            right, right_failures = self._embed(items[middle:])
+            left.update(right)
+            return left, left_failures + right_failures
+
+    def process(self, batch):
+        batch = self._claim(batch)
+        to_embed = [item for item in batch if item.text]
+        embeddings, failures = self._embed(to_embed) if to_embed else ({}, [])
+        failed = {id(item) for item, _ in failures}
+        for item, error in failures:
+            self._retry(item, error)
+
+        backfilled = set()
+        for item in batch:
+            if id(item) in failed:
+                continue
+            target = TARGETS[item.table]
+            # Rows with nothing to embed (e.g. a profile without skills) just become ready.
+            try:
+                self._guarded_update(item, {
+                    target.embedding_column: embeddings.get(id(item)),
+                    "embedding_status": "ready"
+                })
+                backfilled.add(item.table)
+            except Exception as e:
+                self._retry(item, e)
+
+        if backfilled and self.on_backfill:
+            self.on_backfill(backfilled)
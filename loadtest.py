@@ -0,0 +1,275 @@
+"""Concurrent multi-session load test for co_lab.py.
+
+Drives many simulated students through the real app with Streamlit's AppTest
+(profile save, pitch-board browse, auto-build, recruiter chat, review
+submit) on the in-memory stand-ins from local_backends.py, and prints a JSON
+report of throughput, p50/p95/p99 latency and backend calls per interaction.
+
+    python loadtest.py --sessions 200 --concurrency 50
+    python loadtest.py --sessions 200 --concurrency 8 --latency-scale 0
+
+AppTest keeps process-global runtime state, so each concurrent session slot is
+its own process running its sessions back to back. All slots talk to one
+stand-in backend served by local_backends.BackendManager and share one cache
+file, like app workers behind a load balancer. No two sessions ever share an
+app process at the same time, so contention inside one Streamlit server
+(shared caches, thread pools, locks) is not exercised; the report says so.
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from collections import defaultdict
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "co_lab.py")
+
+CONCURRENCY_MODEL = (
+    "one AppTest session per process at a time; processes share one stand-in backend "
+    "and one cache file, but no two sessions share an app process, so in-process "
+    "contention (st.cache_resource objects, thread pools, locks) is not measured"
+)
+
+INTERACTIONS = ["page_load", "profile_save", "pitch_board_browse", "auto_build", "recruiter_chat", "review_submit"]
+
+ROLES = ["Developer", "Designer", "Project Manager", "Researcher", "Presenter"]
+
+RECRUITER_PROMPTS = [
+    "I need a Python developer who is free on weekends.",
+    "Looking for a designer who knows Figma and is available evenings.",
+    "We need a researcher with market research skills on weekdays.",
+]
+
+
+def _by_label(elements, label):
+    for element in elements:
+        if element.label == label:
+            return element
+    raise LookupError(f"No widget labelled {label!r}")
+
+
+def _save_profile(at, index):
+    _by_label(at.text_input, "My Email (This is your unique ID)").input(f"loadtest{index}@example.edu")
+    _by_label(at.text_input, "My Full Name").input(f"Load Test {index}")
+    _by_label(at.text_input, "My GitHub Username (Optional)").input(f"loadtest{index}")
+    _by_label(at.selectbox, "My Primary Role").select(ROLES[index % len(ROLES)])
+    _by_label(at.text_area, "My Technical Skills").input("Python, React, SQL, Public Speaking")
+    _by_label(at.checkbox, "Weekends").check()
+    _by_label(at.button, "Create / Update My Profile").click()
+    at.run()
+
+
+def _auto_build(at, project_id):
+    at.button(key=f"build_{project_id}").click()
+    at.run()
+
+
+def _recruiter_chat(at, index):
+    at.chat_input[0].set_value(RECRUITER_PROMPTS[index % len(RECRUITER_PROMPTS)])
+    at.run()
+
+
+def _submit_review(at, index, profiles):
+    _by_label(at.selectbox, "Your Email (Reviewer)").select(f"student{index % profiles}@example.edu")
+    _by_label(at.selectbox, "Which project was this for?").select_index(0)
+    _by_label(at.selectbox, "Your Teammate's Email (Who you are reviewing)").select(f"student{(index + 1) % profiles}@example.edu")
+    _by_label(at.slider, "Reliability Rating (1=Unreliable, 5=Excellent)").set_value(4)
+    _by_label(at.button, "Submit Anonymous Review").click()
+    at.run()
+
+
+def run_session(index, options):
+    from streamlit.testing.v1 import AppTest
+    import local_backends
+
+    session = f"session-{index}"
+    at = AppTest.from_file(APP_PATH, default_timeout=options["timeout"])
+    at.secrets["COLAB_BACKEND"] = "local"
+    at.secrets["LOCAL_BACKEND_SESSION"] = session
+    at.secrets["COLAB_CACHE_PATH"] = options["cache_path"]
+    at.secrets["TEAM_REPORT_MODE"] = options["report_mode"]
+
+    project_id = (index % options["projects"]) + 1
+    steps = [
+        ("page_load", lambda: at.run()),
+        ("profile_save", lambda: _save_profile(at, index)),
+        ("pitch_board_browse", lambda: at.run()),
+        ("auto_build", lambda: _auto_build(at, project_id)),
+        ("recruiter_chat", lambda: _recruiter_chat(at, index)),
+        ("review_submit", lambda: _submit_review(at, index, options["profiles"])),
+    ]
+
+    results = []
+    for name, step in steps:
+        before = local_backends.call_counts(session)
+        start = time.perf_counter()
+        error = None
+        try:
+            step()
+            if at.exception:
+                error = at.exception[0].message
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        latency = time.perf_counter() - start
+        after = local_backends.call_counts(session)
+        calls = {op: after[op] - before.get(op, 0) for op in after if after[op] != before.get(op, 0)}
+        results.append({"interaction": name, "latency": latency, "calls": calls, "error": error})
+        if error and name == "page_load":
+            break
+    return results
+
+
+def run_worker(indices, options, start_barrier, results):
+    """Run one concurrency slot: warm up, wait for every slot, then run `indices` back to back."""
+    try:
+        import local_backends
+        import streamlit.logger
+        import streamlit.testing.v1  # noqa: F401
+        # AppTest runs outside a real server, which makes Streamlit warn on every rerun.
+        streamlit.logger.set_log_level("error")
+        local_backends.configure(latency_scale=options["latency_scale"])
+        local_backends.use_backend(options["backend_address"], options["backend_authkey"])
+    except Exception:
+        start_barrier.abort()
+        results.put({"error": traceback.format_exc()})
+        return
+
+    # Imports and connections are done before the clock starts in main().
+    try:
+        start_barrier.wait()
+        output = []
+        for index in indices:
+            output.extend(run_session(index, options))
+        results.put({
+            "results": output,
+            "background_calls": local_backends.call_counts("background"),
+        })
+    except Exception:
+        results.put({"error": traceback.format_exc()})
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(values)))
+    return values[rank - 1]
+
+
+def summarize(results, wall_time, background_calls, cache_stats=None):
+    by_interaction = defaultdict(list)
+    for result in results:
+        by_interaction[result["interaction"]].append(result)
+
+    interactions = {}
+    for name in INTERACTIONS:
+        runs = by_interaction.get(name, [])
+        if not runs:
+            continue
+        latencies = sorted(r["latency"] * 1000 for r in runs)
+        call_totals = defaultdict(int)
+        for r in runs:
+            for op, count in r["calls"].items():
+                call_totals[op] += count
+        errors = [r["error"] for r in runs if r["error"]]
+        interactions[name] = {
+            "count": len(runs),
+            "errors": len(errors),
+            "first_error": errors[0] if errors else None,
+            "p50_ms": round(percentile(latencies, 50), 1),
+            "p95_ms": round(percentile(latencies, 95), 1),
+            "p99_ms": round(percentile(latencies, 99), 1),
+            "backend_calls": round(sum(call_totals.values()) / len(runs), 2),
+            "backend_calls_by_op": {op: round(total / len(runs), 2) for op, total in sorted(call_totals.items())},
+        }
+
+    return {
+        "wall_time_s": round(wall_time, 2),
+        "interactions_total": len(results),
+        "throughput_per_s": round(len(results) / wall_time, 2) if wall_time else None,
+        "interactions": interactions,
+        "background_calls": background_calls,
+        "cache": cache_stats or {},
+        "concurrency_model": CONCURRENCY_MODEL,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test co_lab.py with many simulated sessions.")
+    parser.add_argument("--sessions", type=int, default=50, help="Total simulated student sessions.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Sessions running at the same time (one process each).")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplier for simulated backend latency (0 disables it).")
+    parser.add_argument("--profiles", type=int, default=200, help="Seeded profiles in the stand-in database.")
+    parser.add_argument("--projects", type=int, default=20, help="Seeded projects in the stand-in database.")
+    parser.add_argument("--report-mode", choices=["pipelined", "single"], default="pipelined", help="TEAM_REPORT_MODE for auto-build.")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds before a single app rerun is considered hung.")
+    parser.add_argument("--pretty", action="store_true", help="Indent the JSON report.")
+    args = parser.parse_args(argv)
+    if args.profiles < 2 or args.projects < 1:
+        parser.error("Need at least 2 profiles and 1 project to exercise reviews and auto-build.")
+
+    import local_backends
+    from shared_cache import SharedCache
+
+    authkey = os.urandom(16)
+    backend = local_backends.BackendManager(authkey=authkey)
+    backend.start(local_backends.configure_backend, ({"profiles": args.profiles, "projects": args.projects},))
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            options = {
+                "latency_scale": args.latency_scale,
+                "profiles": args.profiles,
+                "projects": args.projects,
+                "report_mode": args.report_mode,
+                "timeout": args.timeout,
+                "cache_path": os.path.join(tmp, "cache.sqlite3"),
+                "backend_address": backend.address,
+                "backend_authkey": authkey,
+            }
+            concurrency = max(1, min(args.concurrency, args.sessions))
+            chunks = [list(range(args.sessions))[slot::concurrency] for slot in range(concurrency)]
+
+            start_barrier = multiprocessing.Barrier(concurrency + 1)
+            results_queue = multiprocessing.Queue()
+            workers = [
+                multiprocessing.Process(target=run_worker, args=(chunk, options, start_barrier, results_queue))
+                for chunk in chunks
+            ]
+            for worker in workers:
+                worker.start()
+            try:
+                start_barrier.wait(timeout=args.timeout)
+            except threading.BrokenBarrierError:
+                pass  # a slot failed to start; its error is in the results queue
+            start = time.perf_counter()
+            outputs = [results_queue.get() for _ in workers]
+            wall_time = time.perf_counter() - start
+            for worker in workers:
+                worker.join()
+            cache_stats = SharedCache(options["cache_path"]).stats()
+    finally:
+        backend.shutdown()
+
+    failures = [output["error"] for output in outputs if "error" in output]
+    if failures:
+        print(failures[0], file=sys.stderr)
+        return 1
+
+    results = [result for output in outputs for result in output["results"]]
+    background_calls = defaultdict(int)
+    for output in outputs:
+        for op, count in output["background_calls"].items():
+            background_calls[op] += count
+
+    report = summarize(results, wall_time, dict(background_calls), cache_stats)
+    print(json.dumps(report, indent=2 if args.pretty else None))
+    return 1 if any(i["errors"] for i in report["interactions"].values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,535 @@
+"""In-memory stand-ins for the external services co_lab.py talks to.
+
+Use these to run tools against a fake backend instead of real Supabase,
+OpenAI and GitHub accounts, e.g. `python diagnostics.py --local`, or run the
+app itself on them with `COLAB_BACKEND = "local"` in secrets.toml.
+
+Every stand-in call sleeps for a typical network latency (scaled by
+`configure(latency_scale=...)`) and is counted per session, which is what
+loadtest.py reports as backend calls per interaction. Latency and counting
+happen in the calling process; `BackendManager` serves one store to several
+processes so they all see the same rows.
+"""
+import copy
+import itertools
+import json
+import math
+import random
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timezone
+from multiprocessing.managers import BaseManager
+from types import SimpleNamespace
+
+from embedding_queue import source_fingerprint
+
+EMBEDDING_DIMENSIONS = 1536
+
+# Rough round-trip times in seconds for each kind of backend call.
+LATENCIES = {
+    "supabase": 0.02,
+    "supabase.rpc": 0.05,
+    "openai.embeddings": 0.15,
+    "openai.chat": 0.5,
+    "openai.chat.token": 0.01,
+    "github": 0.25,
+}
+
+SETTINGS = {
+    "latency_scale": 1.0,
+    "profiles": 200,
+    "projects": 20,
+}
+
+_calls = Counter()
+_calls_lock = threading.Lock()
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def configure(**settings):
+    """Override SETTINGS; seed sizes only apply before the shared store is created."""
+    unknown = set(settings) - set(SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown local backend settings: {', '.join(sorted(unknown))}")
+    SETTINGS.update(settings)
+
+
+def _delay(latency_key):
+    delay = LATENCIES[latency_key] * SETTINGS["latency_scale"]
+    if delay:
+        time.sleep(delay)
+
+
+def _call(session, name, latency_key):
+    with _calls_lock:
+        _calls[(session, name)] += 1
+    _delay(latency_key)
+
+
+def call_counts(session=None):
+    """Return {call name: count} for one session."""
+    with _calls_lock:
+        return {name: count for (s, name), count in _calls.items() if s == session}
+
+
+class LocalResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+    # supabase-py responses unpack as `data, count = ...execute()`
+    def __iter__(self):
+        yield "data", self.data
+        yield "count", self.count
+
+
+class LocalQuery:
+    def __init__(self, backend, table, session=None):
+        self.backend = backend
+        self.table = table
+        self.session = session
+        self.action = "select"
+        self.payload = None
+        self.columns = "*"
+        self.count = None
+        self.head = False
+        self.filters = []
+        self.order_by = None
+        self.limit_to = None
+        self.on_conflict = None
+
+    def select(self, columns="*", count=None, head=False):
+        self.columns = columns
+        self.count = count
+        self.head = head
+        return self
+
+    def insert(self, rows):
+        self.action, self.payload = "insert", rows
+        return self
+
+    def upsert(self, rows, on_conflict=None):
+        self.action, self.payload, self.on_conflict = "upsert", rows, on_conflict
+        return self
+
+    def update(self, values):
+        self.action, self.payload = "update", values
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, "eq", value))
+        return self
+
+    def is_(self, column, value):
+        self.filters.append((column, "eq", None if value == "null" else value))
+        return self
+
+    def gt(self, column, value):
+        self.filters.append((column, "gt", value))
+        return self
+
+    def lt(self, column, value):
+        self.filters.append((column, "lt", value))
+        return self
+
+    def in_(self, column, values):
+        self.filters.append((column, "in", list(values)))
+        return self
+
+    def order(self, column, desc=False):
+        self.order_by = (column, desc)
+        return self
+
+    def limit(self, size):
+        self.limit_to = size
+        return self
+
+    def execute(self):
+        _call(self.session, f"supabase.{self.action}:{self.table}", "supabase")
+        return self.backend.run_query(self)
+
+    def __getstate__(self):
+        # Only the query itself travels to a backend served by BackendManager.
+        state = dict(self.__dict__)
+        state["backend"] = None
+        return state
+
+
+class LocalRpc:
+    def __init__(self, backend, name, params, session=None):
+        self.backend = backend
+        self.name = name
+        self.params = params
+        self.session = session
+        self.limit_to = None
+
+    def limit(self, size):
+        self.limit_to = size
+        return self
+
+    def execute(self):
+        _call(self.session, f"supabase.rpc:{self.name}", "supabase.rpc")
+        return self.backend.run_rpc(self.name, self.params, self.limit_to)
+
+
+def _cosine_similarity(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class LocalSupabase:
+    """Mimics the slice of the supabase-py client that co_lab.py uses."""
+
+    TABLES = ("profiles", "projects", "project_roles", "team_reviews", "messages")
+
+    def __init__(self, seed=None):
+        self.lock = threading.Lock()
+        self.tables = {name: [] for name in self.TABLES}
+        self.ids = itertools.count(1)
+        for table, rows in (seed or {}).items():
+            for row in rows:
+                self._insert_row(table, dict(row))
+
+    def table(self, name):
+        return LocalQuery(self, name)
+
+    def rpc(self, name, params):
+        return LocalRpc(self, name, params)
+
+    def _rows(self, name):
+        if name not in self.tables:
+            raise Exception(f'relation "public.{name}" does not exist')
+        return self.tables[name]
+
+    def _insert_row(self, table, row):
+        row.setdefault("id", next(self.ids))
+        row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+        if table == "projects":
+            row.setdefault("status", "Open")
+        if table == "project_roles":
+            row.setdefault("status", "Open")
+        self._rows(table).append(row)
+        return row
+
+    def _matches(self, row, filters):
+        for column, op, value in filters:
+            if op == "eq" and row.get(column) != value:
+                return False
+            if op == "gt" and (row.get(column) is None or not row.get(column) > value):
+                return False
+            if op == "lt" and (row.get(column) is None or not row.get(column) < value):
+                return False
+            if op == "in" and row.get(column) not in value:
+                return False
+        return True
+
+    def _select(self, query):
+        rows = [r for r in self._rows(query.table) if self._matches(r, query.filters)]
+        if query.order_by:
+            column, desc = query.order_by
+            rows = sorted(rows, key=lambda r: r.get(column) or "", reverse=desc)
+        total = len(rows)
+        if query.limit_to is not None:
+            rows = rows[:query.limit_to]
+        rows = copy.deepcopy(rows)
+        if query.table == "projects" and "project_roles" in query.columns:
+            for row in rows:
+                row["project_roles"] = [
+                    {k: r[k] for k in ("id", "role_name", "status")}
+                    for r in self.tables["project_roles"] if r["project_id"] == row["id"]
+                ]
+        data = [] if query.head else rows
+        return LocalResponse(data, total if query.count else None)
+
+    def run_query(self, query):
+        with self.lock:
+            if query.action == "select":
+                return self._select(query)
+            if query.action == "update":
+                updated = []
+                for row in self._rows(query.table):
+                    if self._matches(row, query.filters):
+                        row.update(query.payload)
+                        updated.append(copy.deepcopy(row))
+                return LocalResponse(updated)
+            payload = query.payload if isinstance(query.payload, list) else [query.payload]
+            written = []
+            for new_row in payload:
+                existing = None
+                if query.action == "upsert" and query.on_conflict:
+                    existing = next((r for r in self._rows(query.table)
+                                     if r.get(query.on_conflict) == new_row.get(query.on_conflict)), None)
+                if existing is not None:
+                    existing.update(new_row)
+                    written.append(copy.deepcopy(existing))
+                else:
+                    written.append(copy.deepcopy(self._insert_row(query.table, dict(new_row))))
+            return LocalResponse(written)
+
+    def run_rpc(self, name, params, limit_to=None):
+        handler = getattr(self, f"_rpc_{name}", None)
+        if handler is None:
+            raise Exception(f"Could not find the function public.{name}")
+        with self.lock:
+            data = handler(**params)
+        if isinstance(data, list) and limit_to is not None:
+            data = data[:limit_to]
+        return LocalResponse(data)
+
+    def _ranked_profiles(self, embedding, role, threshold, availability=None):
+        results = []
+        for profile in self.tables["profiles"]:
+            # Same filter as the SQL functions in SUPABASE_SETUP.md.
+            if profile.get("embedding_status") != "ready" or profile.get("skills_embedding") is None or embedding is None:
+                continue
+            if role and profile.get("primary_role") != role:
+                continue
+            if availability and not all(profile.get(f"availability_{slot}") for slot, wanted in availability.items() if wanted):
+                continue
+            similarity = _cosine_similarity(embedding, profile["skills_embedding"])
+            if similarity >= threshold:
+                match = {k: v for k, v in profile.items() if k != "skills_embedding"}
+                match["similarity"] = similarity
+                results.append(match)
+        return sorted(results, key=lambda m: m["similarity"], reverse=True)
+
+    def _rpc_match_profiles(self, query_embedding, match_threshold, role_query,
+                            weekdays_query, weekends_query, evenings_query):
+        availability = {"weekdays": weekdays_query, "weekends": weekends_query, "evenings": evenings_query}
+        return self._ranked_profiles(query_embedding, role_query, match_threshold, availability)
+
+    def _rpc_match_profiles_for_project(self, p_project_embedding, p_role_query):
+        return self._ranked_profiles(p_project_embedding, p_role_query, 0.0)
+
+    def _rpc_save_profile(self, profile):
+        existing = next((r for r in self.tables["profiles"] if r["email"] == profile["email"]), None)
+        row = dict(profile)
+        if (existing is None or existing.get("embedding_source_hash") != row.get("embedding_source_hash")
+                or existing.get("embedding_status") == "failed"):
+            row["skills_embedding"] = None
+            row["embedding_status"] = "pending" if row.get("embedding_source_hash") else "ready"
+        if existing is None:
+            return self._insert_row("profiles", row)["embedding_status"]
+        existing.update(row)
+        return existing["embedding_status"]
+
+    def _rpc_get_average_rating(self, user_email):
+        ratings = [r["reliability_rating"] for r in self.tables["team_reviews"] if r["reviewee_email"] == user_email]
+        return sum(ratings) / len(ratings) if ratings else None
+
+
+class LocalSupabaseSession:
+    """A LocalSupabase client whose calls are counted under `session`."""
+
+    def __init__(self, backend, session):
+        self.backend = backend
+        self.session = session
+
+    def table(self, name):
+        return LocalQuery(self.backend, name, self.session)
+
+    def rpc(self, name, params):
+        return LocalRpc(self.backend, name, params, self.session)
+
+
+def local_embedding(text):
+    """Deterministic bag-of-words vector, so similar skill lists score as similar."""
+    vector = [0.0] * EMBEDDING_DIMENSIONS
+    for token in re.findall(r"[a-z0-9+#]+", text.lower()):
+        vector[zlib.crc32(token.encode("utf-8")) % EMBEDDING_DIMENSIONS] += 1.0
+    return vector
+
+
+ROLE_KEYWORDS = {
+    "developer": "Developer",
+    "designer": "Designer",
+    "manager": "Project Manager",
+    "researcher": "Researcher",
+    "presenter": "Presenter",
+}
+
+
+class _LocalEmbeddings:
+    def __init__(self, session):
+        self.session = session
+
+    def create(self, input, model):
+        _call(self.session, "openai.embeddings", "openai.embeddings")
+        return SimpleNamespace(data=[
+            SimpleNamespace(index=i, embedding=local_embedding(text)) for i, text in enumerate(input)
+        ])
+
+
+class _LocalCompletions:
+    def __init__(self, session):
+        self.session = session
+
+    def create(self, model, messages, temperature=None, response_format=None, stream=False):
+        _call(self.session, f"openai.chat:{model}", "openai.chat")
+        prompt = messages[-1]["content"]
+        if response_format and response_format.get("type") == "json_object":
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(self._intent(prompt))))])
+        text = self._report(prompt)
+        if stream:
+            return self._stream(text)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+    def _intent(self, prompt):
+        lowered = prompt.lower()
+        role = next((name for keyword, name in ROLE_KEYWORDS.items() if keyword in lowered), None)
+        availability = [slot for slot in ("weekdays", "weekends", "evenings") if slot.rstrip("s") in lowered]
+        return {"role": role, "availability": availability, "skills_query": prompt if role else None}
+
+    def _report(self, briefing):
+        lines = []
+        for line in briefing.splitlines():
+            if line.startswith("--- ROLE:"):
+                lines.append(f"### {line[len('--- ROLE:'):].strip(' -')}")
+            elif line.startswith("Candidate 1:"):
+                lines.append(f"**{line[len('Candidate 1:'):].strip()}** looks like a strong fit for this role.")
+            elif line == "No candidates found.":
+                lines.append("No candidates were found for this role yet.")
+        return "\n\n".join(lines) or "No roles to report on."
+
+    def _stream(self, text):
+        for word in re.findall(r"\S+\s*", text):
+            _delay("openai.chat.token")
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word))])
+
+
+class LocalOpenAI:
+    """Mimics openai.OpenAI's embeddings and chat completions."""
+
+    def __init__(self, session=None):
+        self.embeddings = _LocalEmbeddings(session)
+        self.chat = SimpleNamespace(completions=_LocalCompletions(session))
+
+
+class LocalGitHubResponse:
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self.payload = payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import requests
+            raise requests.exceptions.HTTPError(response=self)
+
+    def json(self):
+        return self.payload
+
+
+class LocalGitHub:
+    """Stands in for the `requests` module when calling the GitHub REST API."""
+
+    LANGUAGES = ["Python", "JavaScript", "TypeScript", "Java", "C++", "Go", None]
+
+    def __init__(self, session=None):
+        self.session = session
+
+    def get(self, url, **kwargs):
+        _call(self.session, "github.get", "github")
+        match = re.search(r"/users/([^/]+)/repos", url)
+        if not match:
+            return LocalGitHubResponse(404, {"message": "Not Found"})
+        rng = random.Random(match.group(1))
+        repos = [
+            {"name": f"repo-{i}", "language": rng.choice(self.LANGUAGES), "fork": rng.random() < 0.2}
+            for i in range(rng.randint(0, 12))
+        ]
+        return LocalGitHubResponse(200, repos)
+
+
+def demo_seed(profiles, projects):
+    """Deterministic profiles, projects and reviews for a fresh local backend."""
+    rng = random.Random(42)
+    skill_pool = ["Python", "React", "Figma", "SQL", "Machine Learning", "Public Speaking",
+                  "Market Research", "Java", "UX Research", "Data Visualization", "Docker", "Writing"]
+    roles = list(ROLE_KEYWORDS.values())
+    seed = {"profiles": [], "projects": [], "project_roles": [], "team_reviews": []}
+    for i in range(profiles):
+        skills = ", ".join(rng.sample(skill_pool, 3))
+        seed["profiles"].append({
+            "email": f"student{i}@example.edu",
+            "name": f"Student {i}",
+            "github_username": f"student{i}" if rng.random() < 0.7 else None,
+            "primary_role": roles[i % len(roles)],
+            "skills": skills,
+            "skills_embedding": local_embedding(skills),
+            "embedding_status": "ready",
+            "embedding_source_hash": source_fingerprint("profiles", {"skills": skills}),
+            "availability_weekdays": rng.random() < 0.5,
+            "availability_weekends": rng.random() < 0.5,
+            "availability_evenings": rng.random() < 0.5,
+        })
+    for i in range(projects):
+        title = f"Project {i}"
+        description = f"A student project that needs {', '.join(rng.sample(skill_pool, 3))}."
+        project_id = i + 1
+        project = {
+            "id": project_id,
+            "leader_email": f"student{i % max(profiles, 1)}@example.edu",
+            "title": title,
+            "description": description,
+            "project_embedding": local_embedding(f"Title: {title}\nDescription: {description}"),
+            "embedding_status": "ready",
+        }
+        project["embedding_source_hash"] = source_fingerprint("projects", project)
+        seed["projects"].append(project)
+        for role in rng.sample(roles, 3):
+            seed["project_roles"].append({"project_id": project_id, "role_name": role})
+    for i in range(profiles * 2):
+        reviewer, reviewee = rng.sample(range(profiles), 2) if profiles > 1 else (0, 0)
+        seed["team_reviews"].append({
+            "project_id": rng.randint(1, max(projects, 1)),
+            "reviewer_email": f"student{reviewer}@example.edu",
+            "reviewee_email": f"student{reviewee}@example.edu",
+            "reliability_rating": rng.randint(1, 5),
+        })
+    return seed
+
+
+def shared_supabase():
+    """The process-wide seeded store that every `connect()` session talks to."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = LocalSupabase(demo_seed(SETTINGS["profiles"], SETTINGS["projects"]))
+        return _shared
+
+
+class BackendManager(BaseManager):
+    """Serves one `shared_supabase()` store to every process that connects to it.
+
+        manager = BackendManager(authkey=key)
+        manager.start(configure_backend, (settings,))
+        ...
+        use_backend(manager.address, key)  # in each client process
+    """
+
+
+BackendManager.register("backend", callable=shared_supabase, exposed=("run_query", "run_rpc"))
+
+
+def configure_backend(settings):
+    """`BackendManager.start` initializer: apply `configure()` settings in the server process."""
+    configure(**settings)
+
+
+def use_backend(address, authkey):
+    """Make `connect()` in this process talk to the store served by a BackendManager."""
+    global _shared
+    manager = BackendManager(address=address, authkey=authkey)
+    manager.connect()
+    with _shared_lock:
+        _shared = manager.backend()
+
+
+def connect(session=None):
+    """Return (supabase, openai_client, http_client) stand-ins whose calls are counted under `session`."""
+    return LocalSupabaseSession(shared_supabase(), session), LocalOpenAI(session), LocalGitHub(session)
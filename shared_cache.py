@@ -0,0 +1,233 @@
+"""SQLite-backed cache shared by every Streamlit worker process on a host.
+
+`st.cache_data` lives inside one process, so each worker behind a load
+balancer repeats the same OpenAI, GitHub and Supabase calls and never sees
+another worker's invalidation. Entries here live in one on-disk database
+that all workers open, and invalidation bumps a per-namespace generation
+number that every worker checks on read. Hit/miss counts are also kept in
+the database, so `stats()` reports hit rates for the whole fleet:
+
+    python shared_cache.py .colab_cache.sqlite3
+
+    cache = SharedCache(".colab_cache.sqlite3", ttls={"github": 1800})
+
+    @cache.cached("github", ttl=600)
+    def get_github_analysis(username): ...
+
+    cache.invalidate("github")
+"""
+import functools
+import hashlib
+import json
+import logging
+import random
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_initialized_paths = set()
+_init_lock = threading.Lock()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    generation INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE TABLE IF NOT EXISTS cache_generations (
+    namespace TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    namespace TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+PURGE_PROBABILITY = 0.01
+
+# Hit/miss counts are buffered in memory and written in one statement once
+# this many lookups or seconds have passed, so reads don't each cost a write.
+STATS_FLUSH_LOOKUPS = 50
+STATS_FLUSH_SECONDS = 5.0
+
+
+class Uncached:
+    """Wrap a cached function's return value to hand it back without storing it.
+
+    Error paths return e.g. `Uncached([])`, so a rate limit or outage seen by
+    one worker isn't served to the whole fleet until the TTL runs out.
+    """
+
+    def __init__(self, value):
+        self.value = value
+
+
+class SharedCache:
+    def __init__(self, path, ttls=None):
+        self.path = path
+        self.ttls = dict(ttls or {})
+        self._pending_stats = Counter()
+        self._stats_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def _connect(self):
+        connections = getattr(_local, "connections", None)
+        if connections is None:
+            connections = _local.connections = {}
+        conn = connections.get(self.path)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            with _init_lock:
+                if self.path not in _initialized_paths:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.executescript(SCHEMA)
+                    _initialized_paths.add(self.path)
+            connections[self.path] = conn
+        return conn
+
+    def _generation(self, conn, namespace):
+        row = conn.execute(
+            "SELECT generation FROM cache_generations WHERE namespace = ?", (namespace,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def ttl_for(self, namespace, default):
+        return float(self.ttls.get(namespace, default))
+
+    def get(self, namespace, key):
+        """Return (found, value) for a live entry of the namespace's current generation."""
+        conn = self._connect()
+        row = conn.execute(
+            """SELECT e.value FROM cache_entries e
+               LEFT JOIN cache_generations g ON g.namespace = e.namespace
+               WHERE e.namespace = ? AND e.key = ? AND e.expires_at > ?
+                 AND e.generation = COALESCE(g.generation, 0)""",
+            (namespace, key, time.time())
+        ).fetchone()
+        if row is None:
+            return False, None
+        return True, json.loads(row[0])
+
+    def set(self, namespace, key, value, ttl, generation=None):
+        conn = self._connect()
+        if generation is None:
+            generation = self._generation(conn, namespace)
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?, ?)",
+            (namespace, key, generation, now + ttl, json.dumps(value))
+        )
+        if random.random() < PURGE_PROBABILITY:
+            conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,))
+
+    def invalidate(self, *namespaces):
+        """Drop every entry in the given namespaces for all workers sharing this cache.
+
+        Best effort: callers invalidate after their database write has
+        committed, so a cache error is logged instead of raised and stale
+        entries simply live out their TTL.
+        """
+        try:
+            conn = self._connect()
+            for namespace in namespaces:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.execute(
+                        """INSERT INTO cache_generations VALUES (?, 1)
+                           ON CONFLICT(namespace) DO UPDATE SET generation = generation + 1""",
+                        (namespace,)
+                    )
+                    conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,))
+                    conn.execute("COMMIT")
+                except Exception:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error as e:
+            logger.warning("Could not invalidate cached %s: %s", ", ".join(namespaces), e)
+
+    def _count(self, namespace, hit):
+        with self._stats_lock:
+            self._pending_stats[(namespace, hit)] += 1
+            due = (sum(self._pending_stats.values()) >= STATS_FLUSH_LOOKUPS
+                   or time.monotonic() - self._last_flush >= STATS_FLUSH_SECONDS)
+        if due:
+            self.flush_stats()
+
+    def flush_stats(self):
+        with self._stats_lock:
+            pending, self._pending_stats = self._pending_stats, Counter()
+            self._last_flush = time.monotonic()
+        namespaces = {namespace for namespace, _ in pending}
+        try:
+            conn = self._connect()
+            for namespace in namespaces:
+                conn.execute(
+                    """INSERT INTO cache_stats VALUES (?, ?, ?)
+                       ON CONFLICT(namespace) DO UPDATE SET
+                           hits = hits + excluded.hits, misses = misses + excluded.misses""",
+                    (namespace, pending[(namespace, True)], pending[(namespace, False)])
+                )
+        except sqlite3.Error:
+            pass  # statistics are best effort
+
+    def stats(self):
+        """Return {namespace: {hits, misses, hit_rate}} summed over every worker."""
+        self.flush_stats()
+        rows = self._connect().execute("SELECT namespace, hits, misses FROM cache_stats ORDER BY namespace")
+        return {
+            namespace: {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+            }
+            for namespace, hits, misses in rows
+        }
+
+    def cached(self, namespace, ttl):
+        """Decorator that memoizes a function's JSON-serializable result in `namespace`.
+
+        The TTL can be overridden per namespace through the `ttls` mapping.
+        Results wrapped in `Uncached` are unwrapped and not stored. If the cache
+        database is unavailable the function is simply called.
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                raw_key = json.dumps([func.__qualname__, args, kwargs], sort_keys=True, default=str)
+                key = hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+                try:
+                    generation = self._generation(self._connect(), namespace)
+                    found, value = self.get(namespace, key)
+                except sqlite3.Error:
+                    value = func(*args, **kwargs)
+                    return value.value if isinstance(value, Uncached) else value
+                self._count(namespace, found)
+                if found:
+                    return value
+                value = func(*args, **kwargs)
+                if isinstance(value, Uncached):
+                    return value.value
+                try:
+                    # Store under the generation read before calling func, so a value
+                    # computed across an invalidation is never served afterwards.
+                    self.set(namespace, key, value, self.ttl_for(namespace, ttl), generation)
+                except (sqlite3.Error, TypeError, ValueError):
+                    pass
+                return value
+            return wrapper
+        return decorator
+
+
+if __name__ == "__main__":
+    print(json.dumps(SharedCache(sys.argv[1] if len(sys.argv) > 1 else ".colab_cache.sqlite3").stats(), indent=2))
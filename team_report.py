@@ -0,0 +1,60 @@
+"""Builds the AI Auto-Builder's "Dream Team" report one role at a time.
+
+Each role's candidates are gathered and its report section is requested on
+a worker thread, so the model is already writing later sections while the
+page renders earlier ones. Worker threads can't draw on the Streamlit page:
+code that may run in them reports problems through `show_error`, and the
+messages come back with the role's section for the main thread to render.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import streamlit as st
+
+_error_sink = threading.local()
+
+
+def show_error(message):
+    """st.error on the main thread; inside a role_sections worker, collected for its section."""
+    errors = getattr(_error_sink, "errors", None)
+    if errors is None:
+        st.error(message)
+    else:
+        errors.append(message)
+
+
+def close_stream(future):
+    if future.cancelled() or future.exception() is not None:
+        return
+    section_stream = future.result()[2]
+    if section_stream is not None and hasattr(section_stream, "close"):
+        section_stream.close()
+
+
+@contextmanager
+def role_sections(roles, build_section, max_workers=4):
+    """Run `build_section(role_name) -> (matches, stream)` for every role concurrently.
+
+    Yields one future per role, in role order; each resolves to
+    (role_name, matches, stream, errors). On exit (including a rerun
+    part-way through the report) roles that haven't started are cancelled
+    and every opened stream is closed.
+    """
+    def run(role_name):
+        _error_sink.errors = []
+        try:
+            matches, section_stream = build_section(role_name)
+            return role_name, matches, section_stream, _error_sink.errors
+        finally:
+            _error_sink.errors = None
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(roles))))
+    futures = [executor.submit(run, role_name) for role_name in roles]
+    try:
+        yield futures
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        for future in futures:
+            # Runs now for finished roles, or when a still-running one finishes.
+            future.add_done_callback(close_stream)
@@ -0,0 +1,226 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import local_backends
+from embedding_queue import EmbeddingQueue, source_fingerprint
+from local_backends import LocalSupabase, local_embedding
+
+
+class RejectedInput(Exception):
+    status_code = 400
+
+
+class FakeEmbeddings:
+    """Embeds like the local stand-in, but rejects texts containing "BAD" or fails outright."""
+
+    def __init__(self):
+        self.requests = []
+        self.outage = False
+        self.during_request = None
+
+    def create(self, input, model):
+        self.requests.append(list(input))
+        if self.during_request:
+            self.during_request()
+        if self.outage:
+            raise ConnectionError("OpenAI unreachable")
+        if any("BAD" in text for text in input):
+            raise RejectedInput("This model's maximum context length was exceeded")
+        return SimpleNamespace(data=[
+            SimpleNamespace(index=i, embedding=local_embedding(text)) for i, text in enumerate(input)
+        ])
+
+
+@pytest.fixture(autouse=True)
+def no_latency():
+    local_backends.configure(latency_scale=0)
+
+
+def pending_profile(email, skills):
+    return {
+        "email": email,
+        "skills": skills,
+        "skills_embedding": None,
+        "embedding_status": "pending",
+        "embedding_source_hash": source_fingerprint("profiles", {"skills": skills}),
+    }
+
+
+def make_queue(profiles, **kwargs):
+    supabase = LocalSupabase({"profiles": profiles})
+    embeddings = FakeEmbeddings()
+    queue = EmbeddingQueue(supabase, SimpleNamespace(embeddings=embeddings), batch_wait=0, **kwargs)
+    return queue, supabase, embeddings
+
+
+def profile(supabase, email):
+    return next(row for row in supabase.tables["profiles"] if row["email"] == email)
+
+
+def run_once(queue):
+    queue.process(queue._next_batch(0))
+
+
+def test_pending_rows_are_backfilled_in_one_request():
+    rows = [pending_profile("a@x.edu", "Python"), pending_profile("b@x.edu", "Figma")]
+    queue, supabase, embeddings = make_queue(rows)
+    for row in rows:
+        queue.enqueue("profiles", row)
+
+    run_once(queue)
+
+    assert len(embeddings.requests) == 1
+    assert profile(supabase, "a@x.edu")["embedding_status"] == "ready"
+    assert profile(supabase, "b@x.edu")["skills_embedding"] == local_embedding("Figma")
+
+
+def test_outage_backs_off_the_whole_batch():
+    rows = [pending_profile("a@x.edu", "Python"), pending_profile("b@x.edu", "Figma")]
+    queue, supabase, embeddings = make_queue(rows)
+    embeddings.outage = True
+    for row in rows:
+        queue.enqueue("profiles", row)
+
+    run_once(queue)
+
+    assert len(embeddings.requests) == 1  # an outage isn't bisected
+    assert queue._next_batch(0) == []  # both rows are backing off
+    assert {item.failures for item in queue._items.values()} == {1}
+    assert profile(supabase, "a@x.edu")["embedding_status"] == "processing"
+
+
+def test_long_outage_never_marks_rows_failed():
+    row = pending_profile("a@x.edu", "Python")
+    queue, supabase, embeddings = make_queue([row], max_attempts=3, max_backoff=60)
+    embeddings.outage = True
+    queue.enqueue("profiles", row)
+
+    for _ in range(10):
+        item, = queue._items.values()
+        assert item.not_before - time.monotonic() <= 60  # backoff stays capped
+        item.not_before = 0
+        run_once(queue)
+        assert profile(supabase, "a@x.edu")["embedding_status"] == "processing"
+
+    embeddings.outage = False
+    queue._items[("profiles", "a@x.edu")].not_before = 0
+    run_once(queue)
+
+    assert profile(supabase, "a@x.edu")["embedding_status"] == "ready"
+    assert profile(supabase, "a@x.edu")["skills_embedding"] == local_embedding("Python")
+
+
+def test_rejected_row_is_isolated_from_the_batch():
+    rows = [pending_profile("good@x.edu", "Python"), pending_profile("bad@x.edu", "BAD " * 10)]
+    queue, supabase, embeddings = make_queue(rows)
+    for row in rows:
+        queue.enqueue("profiles", row)
+
+    run_once(queue)
+
+    assert profile(supabase, "good@x.edu")["skills_embedding"] == local_embedding("Python")
+    assert profile(supabase, "good@x.edu")["embedding_status"] == "ready"
+    assert profile(supabase, "bad@x.edu")["embedding_status"] == "processing"
+    assert list(queue._items) == [("profiles", "bad@x.edu")]
+
+
+def test_row_is_marked_failed_after_max_attempts():
+    row = pending_profile("bad@x.edu", "BAD")
+    queue, supabase, _ = make_queue([row], max_attempts=3)
+    queue.enqueue("profiles", row)
+
+    for _ in range(3):
+        for item in queue._items.values():
+            item.not_before = 0
+        run_once(queue)
+
+    assert profile(supabase, "bad@x.edu")["embedding_status"] == "failed"
+    assert queue._items == {}
+
+
+def test_stale_backfill_does_not_overwrite_newer_save():
+    row = pending_profile("a@x.edu", "Python")
+    queue, supabase, embeddings = make_queue([row])
+    queue.enqueue("profiles", row)
+
+    # The student saves new skills while the old text is being embedded.
+    embeddings.during_request = lambda: profile(supabase, "a@x.edu").update(pending_profile("a@x.edu", "Figma"))
+    run_once(queue)
+
+    saved = profile(supabase, "a@x.edu")
+    assert saved["embedding_status"] == "pending"
+    assert saved["skills_embedding"] is None
+
+
+def test_claim_embeds_the_latest_saved_text():
+    row = pending_profile("a@x.edu", "Python")
+    queue, supabase, _ = make_queue([row])
+    queue.enqueue("profiles", row)
+
+    profile(supabase, "a@x.edu").update(pending_profile("a@x.edu", "Figma"))
+    run_once(queue)
+
+    assert profile(supabase, "a@x.edu")["embedding_status"] == "ready"
+    assert profile(supabase, "a@x.edu")["skills_embedding"] == local_embedding("Figma")
+
+
+def test_workers_sweeping_the_same_row_embed_it_once():
+    queue, supabase, embeddings = make_queue([pending_profile("a@x.edu", "Python")])
+    other = EmbeddingQueue(supabase, SimpleNamespace(embeddings=embeddings), batch_wait=0)
+    queue.sweep()
+    other.sweep()
+
+    run_once(queue)
+    run_once(other)
+
+    assert len(embeddings.requests) == 1
+    assert profile(supabase, "a@x.edu")["embedding_status"] == "ready"
+
+
+def test_workers_share_the_attempt_limit_for_a_rejected_row():
+    queue, supabase, embeddings = make_queue([pending_profile("bad@x.edu", "BAD")], max_attempts=2)
+    other = EmbeddingQueue(supabase, SimpleNamespace(embeddings=embeddings), batch_wait=0, max_attempts=2)
+    queue.sweep()
+    other.sweep()
+
+    for _ in range(2):
+        for q in (queue, other):
+            for item in q._items.values():
+                item.not_before = 0
+            run_once(q)
+
+    assert len(embeddings.requests) == 2
+    assert profile(supabase, "bad@x.edu")["embedding_status"] == "failed"
+
+
+def test_sweep_releases_claims_of_a_dead_worker():
+    queue, supabase, embeddings = make_queue([pending_profile("a@x.edu", "Python")])
+    queue.sweep()
+    queue._claim(queue._next_batch(0))  # claimed, then the worker dies
+    assert profile(supabase, "a@x.edu")["embedding_status"] == "processing"
+
+    other = EmbeddingQueue(supabase, SimpleNamespace(embeddings=embeddings), batch_wait=0)
+    other.sweep()
+    assert other._items == {}  # the claim is still live
+
+    other.claim_ttl = -1
+    other.sweep()
+    run_once(other)
+    assert profile(supabase, "a@x.edu")["embedding_status"] == "ready"
+
+
+def test_sweep_reaches_orphaned_rows_past_failing_ones():
+    failing = [pending_profile(f"a{i}@x.edu", "BAD") for i in range(3)]
+    queue, supabase, _ = make_queue(failing, batch_size=2)
+    queue.sweep()
+    run_once(queue)
+    run_once(queue)  # the failing rows are now backing off in the queue
+
+    # A row left pending by a worker that restarted before backfilling it.
+    supabase.table("profiles").insert(pending_profile("z@x.edu", "Python")).execute()
+    queue.sweep()
+
+    assert ("profiles", "z@x.edu") in queue._items
+    assert all(queue._items[("profiles", row["email"])].attempts == 1 for row in failing)
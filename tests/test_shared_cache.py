@@ -0,0 +1,133 @@
+import time
+
+import shared_cache
+from shared_cache import SharedCache, Uncached
+
+
+def make_counter(cache, namespace="things", ttl=60):
+    calls = []
+
+    @cache.cached(namespace, ttl=ttl)
+    def lookup(value):
+        calls.append(value)
+        return {"value": value}
+
+    return lookup, calls
+
+
+def test_second_call_is_served_from_cache(tmp_path):
+    cache = SharedCache(str(tmp_path / "cache.sqlite3"))
+    lookup, calls = make_counter(cache)
+
+    assert lookup(1) == {"value": 1}
+    assert lookup(1) == {"value": 1}
+    assert calls == [1]
+
+
+def test_entries_are_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    worker_a, calls_a = make_counter(SharedCache(path))
+    worker_b, calls_b = make_counter(SharedCache(path))
+
+    worker_a(1)
+    assert worker_b(1) == {"value": 1}
+    assert calls_b == []
+
+
+def test_invalidation_reaches_other_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    lookup, calls = make_counter(SharedCache(path))
+
+    lookup(1)
+    SharedCache(path).invalidate("things")
+    lookup(1)
+    assert calls == [1, 1]
+
+
+def test_invalidating_an_unavailable_database_does_not_raise(tmp_path, caplog):
+    cache = SharedCache(str(tmp_path / "missing-dir" / "cache.sqlite3"))
+
+    cache.invalidate("profiles")
+
+    assert "Could not invalidate cached profiles" in caplog.text
+
+
+def test_invalidation_only_drops_its_namespace(tmp_path):
+    cache = SharedCache(str(tmp_path / "cache.sqlite3"))
+    things, thing_calls = make_counter(cache, "things")
+    others, other_calls = make_counter(cache, "others")
+
+    things(1)
+    others(1)
+    cache.invalidate("things")
+    things(1)
+    others(1)
+    assert thing_calls == [1, 1]
+    assert other_calls == [1]
+
+
+def test_value_computed_across_an_invalidation_is_not_served(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SharedCache(path)
+    other_worker = SharedCache(path)
+    calls = []
+
+    @cache.cached("things", ttl=60)
+    def lookup(value):
+        calls.append(value)
+        if len(calls) == 1:
+            # Another worker saves while this value is being computed.
+            other_worker.invalidate("things")
+            return "stale"
+        return "fresh"
+
+    assert lookup(1) == "stale"
+    assert lookup(1) == "fresh"
+    assert lookup(1) == "fresh"
+    assert len(calls) == 2
+
+
+def test_ttl_override_expires_entries(tmp_path):
+    cache = SharedCache(str(tmp_path / "cache.sqlite3"), ttls={"things": 0.05})
+    lookup, calls = make_counter(cache, ttl=60)
+
+    lookup(1)
+    time.sleep(0.1)
+    lookup(1)
+    assert calls == [1, 1]
+
+
+def test_uncached_results_are_returned_but_not_stored(tmp_path):
+    cache = SharedCache(str(tmp_path / "cache.sqlite3"))
+    calls = []
+
+    @cache.cached("things", ttl=60)
+    def lookup(value):
+        calls.append(value)
+        return Uncached([])
+
+    assert lookup(1) == []
+    assert lookup(1) == []
+    assert calls == [1, 1]
+
+
+def test_unavailable_database_falls_back_to_calling_the_function(tmp_path):
+    cache = SharedCache(str(tmp_path / "missing-dir" / "cache.sqlite3"))
+    lookup, calls = make_counter(cache)
+
+    assert lookup(1) == {"value": 1}
+    assert lookup(1) == {"value": 1}
+    assert calls == [1, 1]
+
+
+def test_stats_are_summed_across_instances(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_cache, "STATS_FLUSH_LOOKUPS", 1)
+    path = str(tmp_path / "cache.sqlite3")
+    worker_a, _ = make_counter(SharedCache(path))
+    worker_b, _ = make_counter(SharedCache(path))
+
+    worker_a(1)
+    worker_b(1)
+    worker_b(2)
+
+    assert SharedCache(path).stats() == {"things": {"hits": 1, "misses": 2, "hit_rate": 0.333}}
@@ -0,0 +1,94 @@
+import threading
+import time
+
+import team_report
+from team_report import role_sections, show_error
+
+
+class FakeStream:
+    def __init__(self, role_name):
+        self.role_name = role_name
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_sections_come_back_in_role_order():
+    roles = ["Developer", "Designer", "Researcher"]
+    delays = {"Developer": 0.1, "Designer": 0.05, "Researcher": 0}
+
+    def build(role_name):
+        time.sleep(delays[role_name])  # later roles finish first
+        return [role_name], FakeStream(role_name)
+
+    with role_sections(roles, build) as futures:
+        sections = [future.result() for future in futures]
+
+    assert [section[0] for section in sections] == roles
+    assert [section[2].role_name for section in sections] == roles
+
+
+def test_errors_come_back_with_their_section():
+    def build(role_name):
+        if role_name == "Designer":
+            show_error("Error fetching rating: ratings down")
+        return [], None
+
+    # One worker runs every role, so errors must not leak between sections.
+    with role_sections(["Developer", "Designer", "Researcher"], build, max_workers=1) as futures:
+        errors = {role_name: errors for role_name, _, _, errors in (f.result() for f in futures)}
+
+    assert errors == {"Developer": [], "Designer": ["Error fetching rating: ratings down"], "Researcher": []}
+
+
+def test_show_error_outside_a_worker_uses_st_error(monkeypatch):
+    shown = []
+    monkeypatch.setattr(team_report.st, "error", shown.append)
+
+    show_error("Error finding matches")
+
+    assert shown == ["Error finding matches"]
+
+
+def test_streams_are_closed_on_early_exit():
+    designer_started = threading.Event()
+    release = threading.Event()
+    streams = {}
+
+    def build(role_name):
+        if role_name == "Designer":
+            designer_started.set()
+            release.wait(5)  # still running when the report is abandoned
+        streams[role_name] = FakeStream(role_name)
+        return [role_name], streams[role_name]
+
+    with role_sections(["Developer", "Designer"], build) as futures:
+        futures[0].result()  # e.g. a rerun after the first section
+        designer_started.wait(5)
+    assert streams["Developer"].closed
+
+    release.set()
+    futures[1].result(timeout=5)
+    deadline = time.monotonic() + 5
+    while not streams["Designer"].closed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert streams["Designer"].closed
+
+
+def test_roles_not_started_are_cancelled_on_early_exit():
+    release = threading.Event()
+    started = []
+
+    def build(role_name):
+        started.append(role_name)
+        release.wait(5)
+        return [], None
+
+    with role_sections(["Developer", "Designer", "Researcher"], build, max_workers=1) as futures:
+        pass
+    release.set()
+    futures[0].result(timeout=5)
+
+    assert started == ["Developer"]
+    assert futures[1].cancelled() and futures[2].cancelled()